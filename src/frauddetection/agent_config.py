@@ -22,10 +22,13 @@ that work with Google's Agent Development Kit and Gemini LLM.
 """
 
 import os
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List, Literal, Optional
 from dataclasses import dataclass
-from google.generativeai import configure, GenerativeModel
-from google.cloud import aiplatform
+from functools import cached_property, lru_cache
+
+# Google AI SDKs are imported on first use to keep startup light
+if TYPE_CHECKING:
+    from google.generativeai import GenerativeModel
 
 @dataclass
 class AgentConfig:
@@ -37,6 +40,10 @@ class AgentConfig:
     max_output_tokens: int = 1024
     fraud_threshold: float = 0.7
     
+    # 'sync' runs Gemini inline; 'batch' defers it for non-real-time scoring
+    analysis_mode: Literal['sync', 'batch'] = 'sync'
+    batch_flush_interval: float = 10.0  # seconds
+    
     # Agent behavior settings
     max_analysis_time: int = 30  # seconds
     enable_learning: bool = True
@@ -55,24 +62,30 @@ class FraudDetectionAgentManager:
     
     def __init__(self, config: AgentConfig):
         self.config = config
-        self.model = None
-        self.agent_client = None
-        self._initialize_services()
     
-    def _initialize_services(self):
-        """Initialize Google AI services"""
+    @cached_property
+    def agent_client(self):
+        """Vertex AI client, initialized on first use"""
         try:
-            # Initialize Vertex AI
+            from google.cloud import aiplatform
             aiplatform.init(
                 project=self.config.project_id,
                 location=self.config.location
             )
-            
-            # Initialize Gemini
+            return aiplatform
+        except Exception as e:
+            print(f"Warning: Failed to initialize Vertex AI: {e}")
+            return None
+    
+    @cached_property
+    def model(self) -> Optional['GenerativeModel']:
+        """Gemini model, initialized on first use (None in dummy mode)"""
+        try:
             api_key = os.environ.get('GEMINI_API_KEY')
             if api_key and api_key != 'dummy-api-key-for-testing':
+                from google.generativeai import configure, GenerativeModel
                 configure(api_key=api_key)
-                self.model = GenerativeModel(
+                model = GenerativeModel(
                     model_name=self.config.model_name,
                     generation_config={
                         "temperature": self.config.temperature,
@@ -80,17 +93,23 @@ class FraudDetectionAgentManager:
                     }
                 )
                 print(f"Initialized Gemini model: {self.config.model_name}")
-            else:
-                print("Warning: Using dummy mode - no valid API key provided")
+                return model
+            print("Warning: Using dummy mode - no valid API key provided")
                 
         except Exception as e:
             print(f"Warning: Failed to initialize AI services: {e}")
             print("Running in fallback mode")
+        return None
     
     def create_fraud_detection_agent(self) -> 'FraudDetectionAgent':
         """Create a new fraud detection agent instance"""
         from main import FraudDetectionAgent  # Import here to avoid circular import
-        return FraudDetectionAgent(self.config.project_id, self.model)
+        return FraudDetectionAgent(
+            self.config.project_id,
+            analysis_mode=self.config.analysis_mode,
+            flush_interval=self.config.batch_flush_interval,
+            model_loader=lambda: self.model
+        )
     
     def get_system_prompt(self) -> str:
         """Get the system prompt for fraud detection"""
@@ -131,42 +150,48 @@ class FraudDetectionAgentManager:
                 setattr(self.config, key, value)
                 print(f"Updated {key} to {value}")
 
-# Default configurations for different environments
-DEVELOPMENT_CONFIG = AgentConfig(
-    project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-dev'),
-    fraud_threshold=0.5,  # Lower threshold for testing
-    temperature=0.2,  # Slightly higher for variety in dev
-    enable_learning=True
-)
+# Default configurations for different environments, built once on first use
+@lru_cache(maxsize=None)
+def _dev_config() -> AgentConfig:
+    return AgentConfig(
+        project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-dev'),
+        fraud_threshold=0.5,  # Lower threshold for testing
+        temperature=0.2,  # Slightly higher for variety in dev
+        enable_learning=True
+    )
 
-STAGING_CONFIG = AgentConfig(
-    project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-staging'),
-    fraud_threshold=0.6,  # Medium threshold
-    temperature=0.1,
-    enable_learning=True
-)
+@lru_cache(maxsize=None)
+def _staging_config() -> AgentConfig:
+    return AgentConfig(
+        project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-staging'),
+        fraud_threshold=0.6,  # Medium threshold
+        temperature=0.1,
+        enable_learning=True
+    )
 
-PRODUCTION_CONFIG = AgentConfig(
-    project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-prod'),
-    fraud_threshold=0.7,  # Higher threshold for production
-    temperature=0.05,  # Very low for consistency
-    enable_learning=False  # Disable learning in production for stability
-)
+@lru_cache(maxsize=None)
+def _prod_config() -> AgentConfig:
+    return AgentConfig(
+        project_id=os.environ.get('AGENT_PROJECT_ID', 'bank-of-anthos-prod'),
+        fraud_threshold=0.7,  # Higher threshold for production
+        temperature=0.05,  # Very low for consistency
+        enable_learning=False  # Disable learning in production for stability
+    )
 
+_CONFIG_FACTORIES = {
+    'development': _dev_config,
+    'dev': _dev_config,
+    'staging': _staging_config,
+    'stage': _staging_config,
+    'production': _prod_config,
+    'prod': _prod_config
+}
+
+@lru_cache(maxsize=8)
 def get_config_for_environment(env: str = None) -> AgentConfig:
-    """Get configuration based on environment"""
+    """Get configuration based on environment (resolved once per argument)"""
     env = env or os.environ.get('ENV', 'development').lower()
-    
-    config_map = {
-        'development': DEVELOPMENT_CONFIG,
-        'dev': DEVELOPMENT_CONFIG,
-        'staging': STAGING_CONFIG,
-        'stage': STAGING_CONFIG,
-        'production': PRODUCTION_CONFIG,
-        'prod': PRODUCTION_CONFIG
-    }
-    
-    return config_map.get(env, DEVELOPMENT_CONFIG)
+    return _CONFIG_FACTORIES.get(env, _dev_config)()
 
 # Example usage patterns for different fraud scenarios
 FRAUD_SCENARIOS = {
@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Shared test setup: makes the service importable and provides session fixtures"""
+
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import orjson
+import pytest
+
+# Add the parent directory to sys.path to import main
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+from main import app, FraudDetectionAgent, _history_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Flask test client shared by the whole session"""
+    app.testing = True
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def sample_transaction():
+    return {
+        "fromAccountNum": "1234567890",
+        "toAccountNum": "0987654321",
+        "amount": "100.00",
+        "description": "Test payment"
+    }
+
+
+@pytest.fixture(scope="session")
+def sample_transaction_json(sample_transaction):
+    return orjson.dumps(sample_transaction)
+
+
+@pytest.fixture(scope="session")
+def sample_history():
+    return [
+        {"amount": "50.00", "description": "Coffee"},
+        {"amount": "25.00", "description": "Lunch"},
+        {"amount": "200.00", "description": "Groceries"}
+    ]
+
+
+@pytest.fixture(scope="session")
+def sample_history_json(sample_history):
+    return orjson.dumps(sample_history)
+
+
+@pytest.fixture(scope="session")
+def mock_success_content():
+    """Canned ledger reply for forwarded transactions"""
+    return b'{"status": "success"}'
+
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    return {'Authorization': 'Bearer valid-test-token'}
+
+
+@pytest.fixture(scope="session")
+def frozen_now():
+    """Fixed, timezone-aware clock for the time-dependent analyzers"""
+    return datetime(2025, 1, 1, 14, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="session")
+def agent():
+    """Agent shared by the stateless analyzer tests; the Gemini model is loaded lazily"""
+    return FraudDetectionAgent("test-project")
+
+
+@pytest.fixture(scope="session")
+def mock_get():
+    """Stub for ledger GETs, installed once so no test reaches the network"""
+    with patch('main._http_session.get') as mock:
+        yield mock
+
+
+@pytest.fixture(scope="session")
+def mock_post():
+    """Stub for ledger POSTs, installed once so no test reaches the network"""
+    with patch('main._http_session.post') as mock:
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def reset_state(mock_get, mock_post, sample_history_json, mock_success_content):
+    """Reset state cached between requests and the ledger stubs' defaults"""
+    _history_cache.clear()
+
+    mock_get.reset_mock(return_value=True)
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.content = sample_history_json
+
+    mock_post.reset_mock(return_value=True)
+    mock_post.return_value.status_code = 200
+    mock_post.return_value.content = mock_success_content
+    mock_post.return_value.headers = {"Content-Type": "application/json"}